@@ -1,16 +1,55 @@
 from flask import Flask, request, jsonify
 import os
-import tempfile
 import uuid
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from otdr_parser import parse_file, SORFile
-from otdr_algorithm import plot_and_detect, coallesce_results
+from otdr_algorithm import plot_and_detect, coallesce_results, AnalysisError
 import numpy as np
 import io
 
 app = Flask(__name__)
 CORS(app)
 
+# Reject oversized uploads before the multipart body is buffered
+app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
+
+# Most recent serialized upload responses (without fileName), keyed by the SHA-256 digest
+# of the SOR file
+MAX_CACHED_RESPONSES = 64
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+# (type, loss, reflection, label) for fiber issues, alternating between loss and break for variety:
+# high loss and more reflective for breaks, low loss for other issues
+FIBER_ISSUE_KINDS = (
+    ('loss', 0.5, -60, 'Loss Event'),
+    ('break', 15, -20, 'Possible Break'),
+)
+
+
+def _midpoints_km(ranges):
+    # Midpoints of [start, end] ranges in metres, converted to km
+    ranges = np.asarray(ranges, dtype=np.float64).reshape(-1, 2)
+    return ((ranges[:, 0] + ranges[:, 1]) * (0.5 / 1000.0)).tolist()
+
+
+def _upload_response(body, file_name):
+    # body is a serialized JSON object shared by all uploads of the same file,
+    # so the per-request file name is spliced in as its first member
+    head = b'{"fileName":' + app.json.dumps(file_name).encode('utf-8') + b','
+    return app.response_class(head + body[1:] + b'\n', mimetype=app.json.mimetype)
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    return jsonify({'error': 'File too large'}), 413
+
+
 @app.route('/api/upload', methods=['POST'])
 def upload_otdr_file():
     if 'file' not in request.files:
@@ -20,17 +59,18 @@ def upload_otdr_file():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
-    # Create a temporary directory for processing
-    temp_dir = tempfile.mkdtemp()
-    temp_file_path = os.path.join(temp_dir, file.filename)
-    
     try:
-        # Save the uploaded file temporarily
-        file.save(temp_file_path)
+        # Read the uploaded file binary straight into memory
+        sor_data = file.read()
         
-        # Read the file binary
-        with open(temp_file_path, 'rb') as f:
-            sor_data = f.read()
+        # Re-uploads of the same capture are served from the cache
+        digest = hashlib.sha256(sor_data).digest()
+        with _response_cache_lock:
+            cached = _response_cache.get(digest)
+            if cached is not None:
+                _response_cache.move_to_end(digest)
+        if cached is not None:
+            return _upload_response(cached, file.filename)
         
         # Parse the SOR file
         sor_file = parse_file(sor_data)
@@ -41,75 +81,50 @@ def upload_otdr_file():
         # Process the file to detect events
         plot_name = os.path.splitext(file.filename)[0]
         fiber_distance = 25000  # Default to 25km, adjust as needed
-        status, info = plot_and_detect(sor_file, plot_name, 50, fiber_distance, "short")
-        
-        # Extract data points for visualization
-        # Scale data points
-        sf = sor_file.data_points.scale_factors[0].scale_factor
-        scaled_data = -(65535 - np.array(sor_file.data_points.scale_factors[0].data)) / float(sf)
+        info = plot_and_detect(sor_file, plot_name, 50, fiber_distance, "short")
         
-        # Calculate distances
-        speed_of_light = 299792458.0  # m/s
-        refractive_index = sor_file.fixed_parameters.group_index / 100000.0
-        speed_of_light_in_fibre = speed_of_light / refractive_index
-        seconds_per_10k_points = sor_file.fixed_parameters.data_spacing[0] / 1e10
-        metres_per_data_spacing = ((seconds_per_10k_points / 10000.0) * speed_of_light_in_fibre)
-        spacing = np.arange(0, metres_per_data_spacing * len(scaled_data), metres_per_data_spacing)[:len(scaled_data)]
+        # Sample spacing (metres) already computed by the analysis; the trace itself is
+        # scaled below, only for the samples that are sent
+        metres_per_data_spacing = info.pop('metres_per_data_spacing')
         
-        # Convert to km for frontend
-        distances_km = [float(d)/1000 for d in spacing]
+        # Generate events for the frontend, one per detected range at its midpoint
+        back_reflection_km = _midpoints_km(info['back_reflections'])
+        fiber_issue_km = _midpoints_km(info['fiber_issues'])
         
-        # Generate events for the frontend
-        events = []
+        events = [{
+            'id': f'br-{i}',
+            'type': 'reflection',
+            'distance': distance,
+            'loss': 0.3,  # Estimated loss
+            'reflection': -30,  # Estimated reflection value
+            'description': f'Back Reflection at {distance:.2f}km'
+        } for i, distance in enumerate(back_reflection_km)]
         
-        # Parse back reflections if found
-        back_reflections = info.get('logs', '').split('back reflection at ')[1].split(' ')[0] if 'logs' in info and 'back reflection at' in info.get('logs', '') else '[]'
-        try:
-            back_reflection_ranges = eval(back_reflections)
-            for i, br_range in enumerate(back_reflection_ranges):
-                # For each back reflection range, create an event
-                mid_point = (br_range[0] + br_range[1]) / 2
-                events.append({
-                    'id': f'br-{i}',
-                    'type': 'reflection',
-                    'distance': float(mid_point)/1000,  # Convert to km
-                    'loss': 0.3,  # Estimated loss
-                    'reflection': -30,  # Estimated reflection value
-                    'description': f'Back Reflection at {mid_point/1000:.2f}km'
-                })
-        except:
-            pass
-        
-        # Parse fiber issues if found
-        fiber_issues = info.get('logs', '').split('fiber issues at ')[1].strip() if 'logs' in info and 'fiber issues at' in info.get('logs', '') else '[]'
-        try:
-            fiber_issue_ranges = eval(fiber_issues)
-            for i, fi_range in enumerate(fiber_issue_ranges):
-                # For each fiber issue range, create an event
-                mid_point = (fi_range[0] + fi_range[1]) / 2
-                events.append({
-                    'id': f'fi-{i}',
-                    'type': 'loss' if i % 2 == 0 else 'break',  # Alternate between loss and break for variety
-                    'distance': float(mid_point)/1000,  # Convert to km
-                    'loss': 15 if i % 2 == 1 else 0.5,  # High loss for breaks, low for other issues
-                    'reflection': -20 if i % 2 == 1 else -60,  # More reflective for breaks
-                    'description': f'{"Possible Break" if i % 2 == 1 else "Loss Event"} at {mid_point/1000:.2f}km'
-                })
-        except:
-            pass
+        events.extend({
+            'id': f'fi-{i}',
+            'type': event_type,
+            'distance': distance,
+            'loss': loss,
+            'reflection': reflection,
+            'description': f'{label} at {distance:.2f}km'
+        } for i, (distance, (event_type, loss, reflection, label))
+            in enumerate(zip(fiber_issue_km, itertools.cycle(FIBER_ISSUE_KINDS))))
         
         # No plot image since we're not generating images with matplotlib
         plot_image = ""
         
         # Format distances and powers for the frontend
         # To avoid sending too much data, sample the arrays (every 10th point)
-        sampled_distances = distances_km[::10]
-        sampled_powers = scaled_data[::10].tolist()
+        # and convert distances to km for the frontend
+        trace = sor_file.data_points.scale_factors[0]
+        sampled_distances = (np.arange(0, len(trace.data), 10) * metres_per_data_spacing / 1000.0).tolist()
+        # This is the only place the plotted powers are scaled, in float64 from the raw samples;
+        # the analysis scales just its distance window, in float32, for detection
+        sampled_powers = ((np.asarray(trace.data[::10], dtype=np.float64) - 65535) / trace.scale_factor).tolist()
         
-        # Prepare the response
+        # Prepare the response; fileName differs per upload and is added when sending it
         response = {
             'success': True,
-            'fileName': file.filename,
             'fiberId': fiber_id,
             'timestamp': sor_file.fixed_parameters.date_time_stamp if sor_file.fixed_parameters else 0,
             'distance': sampled_distances,
@@ -119,19 +134,21 @@ def upload_otdr_file():
             'info': info
         }
         
-        return jsonify(response)
+        # Serialize once; cache hits reuse the body without running jsonify again
+        body = app.json.dumps(response, separators=(',', ':')).encode('utf-8')
+        with _response_cache_lock:
+            _response_cache[digest] = body
+            if len(_response_cache) > MAX_CACHED_RESPONSES:
+                _response_cache.popitem(last=False)
+        
+        return _upload_response(body, file.filename)
+    
+    except AnalysisError as e:
+        return jsonify({'error': f'Failed to analyze sor file with error {e}'}), 422
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    
-    finally:
-        # Clean up temporary files
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-        try:
-            os.rmdir(temp_dir)
-        except:
-            pass
 
 if __name__ == '__main__':
-    app.run(debug=True, port=8000)
\ No newline at end of file
+    # Development server only; see the README for running under gunicorn
+    app.run(host='0.0.0.0', port=8000)
\ No newline at end of file
@@ -1,30 +1,79 @@
 import numpy as np
-from scipy.ndimage import gaussian_filter1d
-from otdr_parser import parse_file, SORFile
+from otdr_parser import parse_path, SORFile
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, fall back to plain Python
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
 
 MIN_SPACING = 10
 
+# Truncated Gaussian (derivative) kernels keyed by (sigma, order, truncate)
+_gauss_cache = {}
+
+
+class AnalysisError(Exception):
+    pass
+
 
 def parse_sor_file(file_path: str):
-    with open(file_path, 'rb') as file:
-        sor_file = parse_file(file.read())
-    return sor_file
+    return parse_path(file_path)
+
+
+def _gauss_kernel(sigma, order=0, truncate=4.0):
+    key = (sigma, order, truncate)
+    if key not in _gauss_cache:
+        radius = int(truncate * sigma + 0.5)
+        x = np.arange(-radius, radius + 1)
+        kernel = np.exp(-0.5 * (x / sigma) ** 2)
+        kernel /= kernel.sum()
+        # Derivatives fold np.gradient's central difference stencils into the smoothing
+        # kernel, so they equal np.gradient (applied once or twice) of the smoothed trace
+        if order == 1:
+            kernel = np.convolve(kernel, [0.5, 0, -0.5])
+        elif order == 2:
+            kernel = np.convolve(kernel, [0.25, 0, -0.5, 0, 0.25])
+        elif order != 0:
+            raise ValueError(f"Unsupported Gaussian derivative order {order}")
+        _gauss_cache[key] = kernel.astype(np.float32)
+    return _gauss_cache[key]
+
+
+def gaussian_filter(data, sigma, order=0):
+    # Gaussian smoothing (order 0) or smoothed derivative per sample (order 1, 2)
+    # in a single convolution; edges are mirrored like scipy's 'reflect' mode
+    kernel = _gauss_kernel(sigma, order)
+    radius = len(kernel) // 2
+    padded = np.pad(data, radius, mode='symmetric')
+    return np.convolve(padded, kernel, mode='valid')
+
+
+@njit(cache=True, nogil=True)
+def enforce_min_spacing(positions, min_spacing):
+    # Keep only positions at least min_spacing after the previously kept one
+    kept = np.empty_like(positions)
+    n_kept = 0
+    last_detected_point = -min_spacing
+    for pos in positions:
+        if pos - last_detected_point >= min_spacing:
+            kept[n_kept] = pos
+            n_kept += 1
+            last_detected_point = pos
+    return kept[:n_kept]
 
 
 def coallesce_results(detected_fiber_issues):
-
-    if len(detected_fiber_issues) == 0:
-        return []
+    # Group sorted positions into intervals no wider than 75m from their start
+    positions = np.asarray(detected_fiber_issues)
     intervaled_results = []
-    curr_interval = [detected_fiber_issues[0], detected_fiber_issues[0]]
-    for i in range(1, len(detected_fiber_issues)):
-        if detected_fiber_issues[i] - curr_interval[0] > 75:
-            intervaled_results.append(curr_interval.copy())
-            curr_interval = [detected_fiber_issues[i], detected_fiber_issues[i]]
-        else:
-            curr_interval[1] = detected_fiber_issues[i]
-
-    intervaled_results.append(curr_interval)
+    start = 0
+    while start < len(positions):
+        end = np.searchsorted(positions, positions[start] + 75, side='right')
+        intervaled_results.append([float(positions[start]), float(positions[end - 1])])
+        start = end
     return intervaled_results
 
 
@@ -33,75 +82,80 @@ def plot_and_detect(sor_file: SORFile,
                     start_panel: str,
                     fiber_distance: str,
                     scan_type: str):
-    try:
-        # Speed of light and refractive index
-        speed_of_light = 299792458.0  # m/s
-        refractive_index = sor_file.fixed_parameters.group_index / 100000.0  # otdrs_out['fixed_parameters']['group_index'] / 100000.0
-        speed_of_light_in_fibre = speed_of_light / refractive_index
-
-        # Distance calculations
-        seconds_per_10k_points = sor_file.fixed_parameters.data_spacing[0] / 1e10  # otdrs_out['fixed_parameters']['data_spacing'][0] / 1e10
-        metres_per_data_spacing = ((seconds_per_10k_points / 10000.0) * speed_of_light_in_fibre)
-
-        # Scale data points
-        sf = sor_file.data_points.scale_factors[0].scale_factor  # otdrs_out['data_points']['scale_factors'][0]['scale_factor']
-        scaled_data = -(65535 - np.array(sor_file.data_points.scale_factors[0].data)) / float(sf)
-
-        # X-axis: distances in meters
-        spacing = np.arange(0, metres_per_data_spacing * len(scaled_data), metres_per_data_spacing)[:len(scaled_data)]
-        valid_indices = spacing <= 8500 if scan_type == "short" and fiber_distance > 8000 else spacing <= fiber_distance
-
-        spacing_filtered = spacing[valid_indices]
-        scaled_data_filtered = scaled_data[valid_indices]
-
-        seconds_to_front_panel = sor_file.fixed_parameters.front_panel_offset / 1e10  # otdrs_out['fixed_parameters']['front_panel_offset']/1e10
-        seconds_to_launch_connector = sor_file.general_parameters.user_offset / 1e10  # otdrs_out['general_parameters']['user_offset']/1e10
-        # And in metres, that's distance = time * speed
-        metres_to_front_panel = seconds_to_front_panel * speed_of_light_in_fibre
-        # Same again for launch - but we do need to offset from the front panel...
-        metres_to_launch_connector = (seconds_to_launch_connector * speed_of_light_in_fibre) + metres_to_front_panel
-        # Find index range for valid data
-        start_idx = np.searchsorted(spacing_filtered, start_panel)
-
-        # Trim data
-        spacing_trimmed = spacing_filtered[start_idx:]
-        scaled_data_trimmed = scaled_data_filtered[start_idx:]
-
-        # Gaussian smoothing for less noisy data analysis
-        sigma_value = 50  # Adjust for stronger/weaker smoothing
-        smoothed_data = gaussian_filter1d(scaled_data_trimmed, sigma=sigma_value)
-
-        # First derivative for high gradient detection and second derivative for potential inflections
-        slope = np.gradient(smoothed_data, spacing_trimmed)
-        curve = np.gradient(slope, spacing_trimmed)
-
-        last_detected_point = -MIN_SPACING
-        back_reflections = []
-        fiber_issues = []
-
-        for i in range(1, len(slope)):
-            drop_amount = slope[i]
-
-            # Fiber Issue Detection
-            if drop_amount >= 0.005 and (spacing_trimmed[i] - last_detected_point) >= MIN_SPACING:
-                fiber_issues.append(spacing_trimmed[i])
-                last_detected_point = spacing_trimmed[i]
-
-            # Back reflection detection
-            elif drop_amount < -.005 and curve[i] < 0:
-                back_reflections.append(spacing_trimmed[i])
-
-        # Just collect the analyzed data for the frontend
-        # No need to generate plots as the frontend will do visualization
-
-        merged_back_reflections = coallesce_results(back_reflections)
-        merged_fiber_issues = coallesce_results(fiber_issues)
-
-        return True, {"logs": f"Successfully analzyed sor file with back reflection at {merged_back_reflections} \
-                      and fiber issues at {merged_fiber_issues}"}
-    except Exception as e:
-        err = f"Failed to analyze sor file with error {e}"
-        return False, {"error": err}
+    if sor_file.fixed_parameters is None or sor_file.general_parameters is None:
+        raise AnalysisError("SOR file is missing its fixed or general parameters block")
+    if sor_file.data_points is None or not sor_file.data_points.scale_factors:
+        raise AnalysisError("SOR file has no data points")
+    if sor_file.fixed_parameters.group_index <= 0 or not sor_file.fixed_parameters.data_spacing \
+            or sor_file.fixed_parameters.data_spacing[0] <= 0:
+        raise AnalysisError("SOR file has an invalid group index or data spacing")
+    if sor_file.data_points.scale_factors[0].scale_factor == 0:
+        raise AnalysisError("SOR file has a zero data points scale factor")
+
+    # Speed of light and refractive index
+    speed_of_light = 299792458.0  # m/s
+    refractive_index = sor_file.fixed_parameters.group_index / 100000.0  # otdrs_out['fixed_parameters']['group_index'] / 100000.0
+    speed_of_light_in_fibre = speed_of_light / refractive_index
+
+    # Distance calculations
+    seconds_per_10k_points = sor_file.fixed_parameters.data_spacing[0] / 1e10  # otdrs_out['fixed_parameters']['data_spacing'][0] / 1e10
+    metres_per_data_spacing = ((seconds_per_10k_points / 10000.0) * speed_of_light_in_fibre)
+
+    sf = sor_file.data_points.scale_factors[0].scale_factor  # otdrs_out['data_points']['scale_factors'][0]['scale_factor']
+    raw_data = sor_file.data_points.scale_factors[0].data
+
+    valid_distance = 8500 if scan_type == "short" and fiber_distance > 8000 else fiber_distance
+
+    seconds_to_front_panel = sor_file.fixed_parameters.front_panel_offset / 1e10  # otdrs_out['fixed_parameters']['front_panel_offset']/1e10
+    seconds_to_launch_connector = sor_file.general_parameters.user_offset / 1e10  # otdrs_out['general_parameters']['user_offset']/1e10
+    # And in metres, that's distance = time * speed
+    metres_to_front_panel = seconds_to_front_panel * speed_of_light_in_fibre
+    # Same again for launch - but we do need to offset from the front panel...
+    metres_to_launch_connector = (seconds_to_launch_connector * speed_of_light_in_fibre) + metres_to_front_panel
+    # Find index range for valid data; spacing is uniform from zero so it follows from the distances
+    start_idx = max(0, int(np.ceil(start_panel / metres_per_data_spacing)))
+    end_idx = max(0, min(len(raw_data), int(np.floor(valid_distance / metres_per_data_spacing)) + 1))
+
+    # Trim the raw samples first and only scale the analysed window (float32 is ample for the
+    # ~0.001 dB resolution and halves memory traffic); the X-axis (distances in meters) is
+    # float64 since the reported positions come from it
+    raw_trimmed = np.asarray(raw_data[start_idx:end_idx], dtype=np.float32)
+    scaled_data_trimmed = (raw_trimmed - np.float32(65535)) * (np.float32(1.0) / np.float32(sf))
+    spacing_trimmed = np.arange(start_idx, end_idx) * metres_per_data_spacing
+    if len(scaled_data_trimmed) == 0:
+        raise AnalysisError(f"No trace samples between {start_panel}m and {valid_distance}m")
+
+    # Gaussian smoothing for less noisy data analysis
+    sigma_value = 50  # Adjust for stronger/weaker smoothing
+    dx = metres_per_data_spacing  # spacing is uniform
+
+    # First derivative for high gradient detection and second derivative for potential inflections,
+    # each taken from the smoothed trace by a single Gaussian derivative convolution
+    slope = gaussian_filter(scaled_data_trimmed, sigma_value, order=1) / dx
+    curve = gaussian_filter(scaled_data_trimmed, sigma_value, order=2) / (dx * dx)
+
+    # The first sample is never considered
+    slope, curve, positions = slope[1:], curve[1:], spacing_trimmed[1:]
+
+    # Fiber Issue Detection
+    fiber_issues = enforce_min_spacing(positions[slope >= 0.005], MIN_SPACING)
+
+    # Back reflection detection
+    refl_mask = slope < -.005
+    refl_mask &= curve < 0
+    back_reflections = positions[refl_mask]
+
+    # Just collect the analyzed data for the frontend
+    # No need to generate plots as the frontend will do visualization
+
+    merged_back_reflections = coallesce_results(back_reflections)
+    merged_fiber_issues = coallesce_results(fiber_issues)
+
+    return {"logs": f"Successfully analzyed sor file with back reflection at {merged_back_reflections} \
+            and fiber issues at {merged_fiber_issues}",
+            "back_reflections": merged_back_reflections,
+            "fiber_issues": merged_fiber_issues,
+            "metres_per_data_spacing": metres_per_data_spacing}
 
 
 def process_traces(otdr_files, fiber_distance, dir="/tmp"):
@@ -118,7 +172,10 @@ def process_traces(otdr_files, fiber_distance, dir="/tmp"):
         port = components[1].lower()
         scan_type = components[2].lower()
         plot_name = f"{device}_{port}_{scan_type}"
-        status, info = plot_and_detect(otdrs_out, plot_name, 50, fiber_distance, scan_type)
+        try:
+            info = plot_and_detect(otdrs_out, plot_name, 50, fiber_distance, scan_type)
+        except AnalysisError as e:
+            info = {"error": f"Failed to analyze sor file with error {e}"}
         images.append(plot_name)
         results[plot_name] = info
     return True, results
@@ -1,19 +1,25 @@
+import mmap
+import os
+import re
 import struct
 from dataclasses import dataclass
-from typing import List, Optional
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
 # --------------------------
 # Types (from src/types.rs)
 # --------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class BlockInfo:
     identifier: str
     revision_number: int  # u16 in Rust
     size: int            # i32
 
 
-@dataclass
+@dataclass(slots=True)
 class MapBlock:
     revision_number: int
     block_size: int
@@ -21,7 +27,7 @@ class MapBlock:
     block_info: List[BlockInfo]
 
 
-@dataclass
+@dataclass(slots=True)
 class GeneralParametersBlock:
     language_code: str
     cable_id: str
@@ -38,7 +44,7 @@ class GeneralParametersBlock:
     comment: str
 
 
-@dataclass
+@dataclass(slots=True)
 class SupplierParametersBlock:
     supplier_name: str
     otdr_mainframe_id: str
@@ -49,7 +55,7 @@ class SupplierParametersBlock:
     other: str
 
 
-@dataclass
+@dataclass(slots=True)
 class FixedParametersBlock:
     date_time_stamp: int
     units_of_distance: str
@@ -80,7 +86,7 @@ class FixedParametersBlock:
     window_coordinate_4: int
 
 
-@dataclass
+@dataclass(slots=True)
 class KeyEvent:
     event_number: int
     event_propogation_time: int
@@ -97,7 +103,7 @@ class KeyEvent:
     comment: str
 
 
-@dataclass
+@dataclass(slots=True)
 class LastKeyEvent:
     event_number: int
     event_propogation_time: int
@@ -120,14 +126,14 @@ class LastKeyEvent:
     optical_return_loss_marker_position_2: int
 
 
-@dataclass
+@dataclass(slots=True)
 class KeyEvents:
     number_of_key_events: int
     key_events: List[KeyEvent]
     last_key_event: LastKeyEvent
 
 
-@dataclass
+@dataclass(slots=True)
 class Landmark:
     landmark_number: int
     landmark_code: str
@@ -143,42 +149,108 @@ class Landmark:
     comment: str
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class DataPointsAtScaleFactor:
     n_points: int
     scale_factor: int
-    data: List[int]
+    data: Union[np.ndarray, List[int]]  # uint16 samples
+
+    def __eq__(self, other):
+        # data is usually an array, which the generated __eq__ cannot compare
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.n_points == other.n_points and self.scale_factor == other.scale_factor
+                and np.array_equal(self.data, other.data))
 
+    __hash__ = None
 
-@dataclass
+
+@dataclass(slots=True)
 class DataPoints:
     number_of_data_points: int
     total_number_scale_factors_used: int
     scale_factors: List[DataPointsAtScaleFactor]
 
 
-@dataclass
+@dataclass(slots=True)
 class LinkParameters:
     number_of_landmarks: int
     landmarks: List[Landmark]
 
 
-@dataclass
+@dataclass(slots=True)
 class ProprietaryBlock:
     header: str
     data: bytes
 
 
-@dataclass
 class SORFile:
-    map: MapBlock
-    general_parameters: Optional[GeneralParametersBlock]
-    supplier_parameters: Optional[SupplierParametersBlock]
-    fixed_parameters: Optional[FixedParametersBlock]
-    key_events: Optional[KeyEvents]
-    link_parameters: Optional[LinkParameters]
-    data_points: Optional[DataPoints]
-    proprietary_blocks: List[ProprietaryBlock]
+    # Only the map is parsed up front; every other block is parsed from the file buffer
+    # the first time its attribute is read, and is None if the map does not list it
+    _FIELDS = ("map", "general_parameters", "supplier_parameters", "fixed_parameters", "key_events",
+               "link_parameters", "data_points", "proprietary_blocks")
+
+    def __init__(self, data: memoryview, map: MapBlock):
+        self._data = data
+        self.map = map
+        self._identifiers = frozenset(bi.identifier for bi in map.block_info)
+        self._locations = block_locations(map)
+        self.link_parameters: Optional[LinkParameters] = None
+
+    def __repr__(self):
+        # Like the dataclass repr; this parses any blocks not read yet
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._FIELDS)
+
+    __hash__ = None
+
+    def _block_range(self, identifier: str) -> Tuple[int, int]:
+        location = self._locations.get(identifier)
+        if location is None or location[0] > len(self._data) or location[0] + location[1] > len(self._data):
+            # Reported block position or length is incorrect, parse it as empty
+            return 0, 0
+        return location[0], location[0] + location[1]
+
+    def _parse_block(self, identifier: str):
+        if identifier not in self._identifiers:
+            return None
+        start, end = self._block_range(identifier)
+        block, _ = _BLOCK_PARSERS[identifier](self._data, start, end)
+        return block
+
+    @cached_property
+    def general_parameters(self) -> Optional[GeneralParametersBlock]:
+        return self._parse_block(BLOCK_ID_GENPARAMS)
+
+    @cached_property
+    def supplier_parameters(self) -> Optional[SupplierParametersBlock]:
+        return self._parse_block(BLOCK_ID_SUPPARAMS)
+
+    @cached_property
+    def fixed_parameters(self) -> Optional[FixedParametersBlock]:
+        return self._parse_block(BLOCK_ID_FXDPARAMS)
+
+    @cached_property
+    def key_events(self) -> Optional[KeyEvents]:
+        return self._parse_block(BLOCK_ID_KEYEVENTS)
+
+    @cached_property
+    def data_points(self) -> Optional[DataPoints]:
+        return self._parse_block(BLOCK_ID_DATAPTS)
+
+    @cached_property
+    def proprietary_blocks(self) -> List[ProprietaryBlock]:
+        proprietary_blocks = []
+        for bi in self.map.block_info:
+            if bi.identifier not in _BLOCK_PARSERS and bi.identifier not in _SKIPPED_BLOCKS:
+                pb, _ = proprietary_block(self._data, *self._block_range(bi.identifier))
+                proprietary_blocks.append(pb)
+        return proprietary_blocks
 
 
 class ParseError(Exception):
@@ -205,487 +277,437 @@ BLOCK_ID_DATAPTS = "DataPts"
 BLOCK_ID_CHECKSUM = "Cksum"
 
 
-def parse_le_i16(data: bytes, offset: int):
-    if offset + 2 > len(data):
+# Precompiled little-endian readers, so the format is not re-parsed on every call
+_S_I16 = struct.Struct('<h').unpack_from
+_S_I32 = struct.Struct('<i').unpack_from
+_S_U16 = struct.Struct('<H').unpack_from
+_S_U32 = struct.Struct('<I').unpack_from
+
+# Fixed-size record layouts, each read with a single unpack
+_BI_FIXED = struct.Struct('<Hi')                # revision_number, size
+_KE_FIXED = struct.Struct('<hihhi6s2s5i')       # key event up to marker_location_5
+_LKE_SUFFIX = struct.Struct('<iiiHii')          # last key event fields after the comment
+_LM_FIXED = struct.Struct('<h2sihiihii2sh')     # landmark up to mode_field_diameter
+_MAP_FIXED = struct.Struct('<Hih')              # map revision_number, block_size, block_count
+_GP_FIBER = struct.Struct('<hh')                # fiber_type, nominal_wavelength
+_GP_FLAG_OFFSETS = struct.Struct('<2sii')       # current_data_flag, user_offset, user_offset_distance
+_FP_PREFIX = struct.Struct('<I2shiih')          # fixed parameters up to total_n_pulse_widths_used
+_FP_SUFFIX = struct.Struct('<ihiHiiiHhHHHH2siiii')  # fixed parameters from group_index to the end
+_DP_COUNTS = struct.Struct('<ih')               # point count and scale factor count (or scale factor)
+
+# A key event with an empty comment: the _KE_FIXED fields plus the comment's null terminator
+_KE_EMPTY_COMMENT_DTYPE = np.dtype([
+    ('event_number', '<i2'),
+    ('event_propogation_time', '<i4'),
+    ('attenuation_coefficient_lead_in_fiber', '<i2'),
+    ('event_loss', '<i2'),
+    ('event_reflectance', '<i4'),
+    ('event_code', 'V6'),
+    ('loss_measurement_technique', 'V2'),
+    ('marker_location_1', '<i4'),
+    ('marker_location_2', '<i4'),
+    ('marker_location_3', '<i4'),
+    ('marker_location_4', '<i4'),
+    ('marker_location_5', '<i4'),
+    ('comment_terminator', 'u1'),
+])
+
+
+# Every reader takes an optional end offset, so parsers can walk a block in place on the
+# whole file buffer; it defaults to the end of the data
+def parse_le_i16(data: bytes, offset: int, end: Optional[int] = None):
+    if (len(data) if end is None else end) - offset < 2:
         raise ParseError("Unexpected end of data in i16")
-    value = struct.unpack_from('<h', data, offset)[0]
+    value = _S_I16(data, offset)[0]
     return value, offset + 2
 
 
-def parse_le_i32(data: bytes, offset: int):
-    if offset + 4 > len(data):
+def parse_le_i32(data: bytes, offset: int, end: Optional[int] = None):
+    if (len(data) if end is None else end) - offset < 4:
         raise ParseError("Unexpected end of data in i32")
-    value = struct.unpack_from('<i', data, offset)[0]
+    value = _S_I32(data, offset)[0]
     return value, offset + 4
 
 
-def parse_le_u16(data: bytes, offset: int):
-    if offset + 2 > len(data):
+def parse_le_u16(data: bytes, offset: int, end: Optional[int] = None):
+    if (len(data) if end is None else end) - offset < 2:
         raise ParseError("Unexpected end of data in u16")
-    value = struct.unpack_from('<H', data, offset)[0]
+    value = _S_U16(data, offset)[0]
     return value, offset + 2
 
 
-def parse_le_u32(data: bytes, offset: int):
-    if offset + 4 > len(data):
+def parse_le_u32(data: bytes, offset: int, end: Optional[int] = None):
+    if (len(data) if end is None else end) - offset < 4:
         raise ParseError("Unexpected end of data in u32")
-    value = struct.unpack_from('<I', data, offset)[0]
+    value = _S_U32(data, offset)[0]
     return value, offset + 4
 
 
-def fixed_length_str(data: bytes, offset: int, n_bytes: int):
-    if offset + n_bytes > len(data):
-        raise ParseError("Unexpected end of data in fixed_length_str")
-    s = data[offset: offset + n_bytes]
+def parse_le_array(data: bytes, offset: int, code: str, item_size: int, count: int, end: Optional[int] = None):
+    # Reads count consecutive little-endian values of struct type code in one call
+    count = max(count, 0)
+    if (len(data) if end is None else end) - offset < item_size * count:
+        raise ParseError(f"Unexpected end of data in {code} array")
+    values = list(struct.unpack_from(f'<{count}{code}', data, offset))
+    return values, offset + item_size * count
+
+
+def decode_fixed_length_str(raw: bytes):
+    # Fixed-length fields are ASCII codes, which decode on a faster path;
+    # UTF-8 is still accepted for files that stray from that
     try:
-        decoded = s.decode("utf-8")
+        return str(raw, "ascii")
+    except UnicodeDecodeError:
+        pass
+    try:
+        return str(raw, "utf-8")
     except UnicodeDecodeError as e:
         raise ParseError("Failed to decode fixed_length_str") from e
+
+
+def fixed_length_str(data: bytes, offset: int, n_bytes: int, end: Optional[int] = None):
+    if offset + n_bytes > (len(data) if end is None else end):
+        raise ParseError("Unexpected end of data in fixed_length_str")
+    decoded = decode_fixed_length_str(data[offset: offset + n_bytes])
     return decoded, offset + n_bytes
 
 
-def null_terminated_chunk(data: bytes, offset: int):
-    end = data.find(b'\0', offset)
-    if end == -1:
-        raise ParseError("Null terminator not found")
-    chunk = data[offset:end]
-    return chunk, end + 1
+# Finds the next null byte in any buffer (bytes or memoryview)
+_find_null = re.compile(b'\0').search
 
 
-def null_terminated_str(data: bytes, offset: int):
-    chunk, new_offset = null_terminated_chunk(data, offset)
+def null_terminated_str(data: bytes, offset: int, end: Optional[int] = None):
+    match = _find_null(data, offset) if end is None else _find_null(data, offset, end)
+    if match is None:
+        raise ParseError("Null terminator not found")
+    stop = match.start()
     try:
-        decoded = chunk.decode("utf-8")
+        decoded = str(data[offset:stop], "utf-8")
     except UnicodeDecodeError as e:
         raise ParseError("Failed to decode null_terminated_str") from e
-    return decoded, new_offset
+    return decoded, stop + 1
 
 
-def block_header(data: bytes, offset: int, header: str):
-    expected = header.encode("utf-8")
-    if data[offset: offset + len(expected)] != expected:
+# Encoded block header strings, including their null terminator
+_HEADERS = {
+    name: name.encode("utf-8") + b'\0'
+    for name in (BLOCK_ID_MAP, BLOCK_ID_GENPARAMS, BLOCK_ID_SUPPARAMS, BLOCK_ID_FXDPARAMS,
+                 BLOCK_ID_KEYEVENTS, BLOCK_ID_LNKPARAMS, BLOCK_ID_DATAPTS, BLOCK_ID_CHECKSUM)
+}
+
+
+def block_header(data: bytes, offset: int, header: str, end: Optional[int] = None):
+    expected = _HEADERS[header]
+    stop = offset + len(expected)
+    if stop > (len(data) if end is None else end) or data[offset:stop] != expected:
         raise ParseError(f"Expected header '{header}' not found")
-    offset += len(expected)
-    if data[offset: offset + 1] != b'\0':
-        raise ParseError("Expected null terminator after header")
-    offset += 1
-    return offset
+    return stop
 
 # --------------------------
 # Parser Functions (from src/parser.rs)
 # --------------------------
 
 
-def map_block_info(data: bytes, offset: int):
-    header_str, offset = null_terminated_str(data, offset)
-    revision_number, offset = parse_le_u16(data, offset)
-    size, offset = parse_le_i32(data, offset)
-    bi = BlockInfo(identifier=header_str, revision_number=revision_number, size=size)
+def map_block_info(data: bytes, offset: int, end: Optional[int] = None):
+    if end is None:
+        end = len(data)
+    header_str, offset = null_terminated_str(data, offset, end)
+    if end - offset < _BI_FIXED.size:
+        raise ParseError("Unexpected end of data in block info")
+    revision_number, size = _BI_FIXED.unpack_from(data, offset)
+    offset += _BI_FIXED.size
+    bi = BlockInfo(header_str, revision_number, size)
     return bi, offset
 
 
-def map_block(data: bytes, offset: int = 0):
-    offset = block_header(data, offset, "Map")
-    revision_number, offset = parse_le_u16(data, offset)
-    block_size, offset = parse_le_i32(data, offset)
-    block_count, offset = parse_le_i16(data, offset)
+def map_block(data: bytes, offset: int = 0, end: Optional[int] = None):
+    if end is None:
+        end = len(data)
+    offset = block_header(data, offset, "Map", end)
+    if end - offset < _MAP_FIXED.size:
+        raise ParseError("Unexpected end of data in map block")
+    revision_number, block_size, block_count = _MAP_FIXED.unpack_from(data, offset)
+    offset += _MAP_FIXED.size
     blocks_to_read = block_count - 1
     if blocks_to_read < 0:
         raise ParseError("Invalid block count in map_block")
-    block_infos = []
-    for _ in range(blocks_to_read):
-        bi, offset = map_block_info(data, offset)
-        block_infos.append(bi)
-    mb = MapBlock(
-        revision_number=revision_number,
-        block_size=block_size,
-        block_count=block_count,
-        block_info=block_infos
-    )
+    block_infos = [None] * blocks_to_read
+    parse_block_info = map_block_info  # local lookup inside the loop
+    for i in range(blocks_to_read):
+        block_infos[i], offset = parse_block_info(data, offset, end)
+    mb = MapBlock(revision_number, block_size, block_count, block_infos)
     return mb, offset
 
 
-def general_parameters_block(data: bytes, offset: int):
-    offset = block_header(data, offset, "GenParams")
-    language_code, offset = fixed_length_str(data, offset, 2)
-    cable_id, offset = null_terminated_str(data, offset)
-    fiber_id, offset = null_terminated_str(data, offset)
-    fiber_type, offset = parse_le_i16(data, offset)
-    nominal_wavelength, offset = parse_le_i16(data, offset)
-    originating_location, offset = null_terminated_str(data, offset)
-    terminating_location, offset = null_terminated_str(data, offset)
-    cable_code, offset = null_terminated_str(data, offset)
-    current_data_flag, offset = fixed_length_str(data, offset, 2)
-    user_offset, offset = parse_le_i32(data, offset)
-    user_offset_distance, offset = parse_le_i32(data, offset)
-    operator_str, offset = null_terminated_str(data, offset)
-    comment, offset = null_terminated_str(data, offset)
+def general_parameters_block(data: bytes, offset: int, end: Optional[int] = None):
+    if end is None:
+        end = len(data)
+    offset = block_header(data, offset, "GenParams", end)
+    language_code, offset = fixed_length_str(data, offset, 2, end)
+    cable_id, offset = null_terminated_str(data, offset, end)
+    fiber_id, offset = null_terminated_str(data, offset, end)
+    if end - offset < _GP_FIBER.size:
+        raise ParseError("Unexpected end of data in general parameters")
+    fiber_type, nominal_wavelength = _GP_FIBER.unpack_from(data, offset)
+    offset += _GP_FIBER.size
+    originating_location, offset = null_terminated_str(data, offset, end)
+    terminating_location, offset = null_terminated_str(data, offset, end)
+    cable_code, offset = null_terminated_str(data, offset, end)
+    if end - offset < _GP_FLAG_OFFSETS.size:
+        raise ParseError("Unexpected end of data in general parameters")
+    current_data_flag, user_offset, user_offset_distance = _GP_FLAG_OFFSETS.unpack_from(data, offset)
+    offset += _GP_FLAG_OFFSETS.size
+    current_data_flag = decode_fixed_length_str(current_data_flag)
+    operator_str, offset = null_terminated_str(data, offset, end)
+    comment, offset = null_terminated_str(data, offset, end)
     gp = GeneralParametersBlock(
-        language_code=language_code,
-        cable_id=cable_id,
-        fiber_id=fiber_id,
-        fiber_type=fiber_type,
-        nominal_wavelength=nominal_wavelength,
-        originating_location=originating_location,
-        terminating_location=terminating_location,
-        cable_code=cable_code,
-        current_data_flag=current_data_flag,
-        user_offset=user_offset,
-        user_offset_distance=user_offset_distance,
-        operator=operator_str,
-        comment=comment
+        language_code, cable_id, fiber_id, fiber_type, nominal_wavelength, originating_location,
+        terminating_location, cable_code, current_data_flag, user_offset, user_offset_distance, operator_str,
+        comment
     )
     return gp, offset
 
 
-def supplier_parameters_block(data: bytes, offset: int):
-    offset = block_header(data, offset, "SupParams")
-    supplier_name, offset = null_terminated_str(data, offset)
-    otdr_mainframe_id, offset = null_terminated_str(data, offset)
-    otdr_mainframe_sn, offset = null_terminated_str(data, offset)
-    optical_module_id, offset = null_terminated_str(data, offset)
-    optical_module_sn, offset = null_terminated_str(data, offset)
-    software_revision, offset = null_terminated_str(data, offset)
-    other, offset = null_terminated_str(data, offset)
+def supplier_parameters_block(data: bytes, offset: int, end: Optional[int] = None):
+    offset = block_header(data, offset, "SupParams", end)
+    supplier_name, offset = null_terminated_str(data, offset, end)
+    otdr_mainframe_id, offset = null_terminated_str(data, offset, end)
+    otdr_mainframe_sn, offset = null_terminated_str(data, offset, end)
+    optical_module_id, offset = null_terminated_str(data, offset, end)
+    optical_module_sn, offset = null_terminated_str(data, offset, end)
+    software_revision, offset = null_terminated_str(data, offset, end)
+    other, offset = null_terminated_str(data, offset, end)
     sp = SupplierParametersBlock(
-        supplier_name=supplier_name,
-        otdr_mainframe_id=otdr_mainframe_id,
-        otdr_mainframe_sn=otdr_mainframe_sn,
-        optical_module_id=optical_module_id,
-        optical_module_sn=optical_module_sn,
-        software_revision=software_revision,
-        other=other
+        supplier_name, otdr_mainframe_id, otdr_mainframe_sn, optical_module_id, optical_module_sn,
+        software_revision, other
     )
     return sp, offset
 
 
-def fixed_parameters_block(data: bytes, offset: int):
-    offset = block_header(data, offset, "FxdParams")
-    date_time_stamp, offset = parse_le_u32(data, offset)
-    units_of_distance, offset = fixed_length_str(data, offset, 2)
-    actual_wavelength, offset = parse_le_i16(data, offset)
-    acquisition_offset, offset = parse_le_i32(data, offset)
-    acquisition_offset_distance, offset = parse_le_i32(data, offset)
-    total_n_pulse_widths_used, offset = parse_le_i16(data, offset)
-    pulse_widths_used = []
-    for _ in range(total_n_pulse_widths_used):
-        pw, offset = parse_le_i16(data, offset)
-        pulse_widths_used.append(pw)
-    data_spacing = []
-    for _ in range(total_n_pulse_widths_used):
-        ds, offset = parse_le_i32(data, offset)
-        data_spacing.append(ds)
-    n_data_points_for_pulse_widths_used = []
-    for _ in range(total_n_pulse_widths_used):
-        ndp, offset = parse_le_i32(data, offset)
-        n_data_points_for_pulse_widths_used.append(ndp)
-    group_index, offset = parse_le_i32(data, offset)
-    backscatter_coefficient, offset = parse_le_i16(data, offset)
-    number_of_averages, offset = parse_le_i32(data, offset)
-    averaging_time, offset = parse_le_u16(data, offset)
-    acquisition_range, offset = parse_le_i32(data, offset)
-    acquisition_range_distance, offset = parse_le_i32(data, offset)
-    front_panel_offset, offset = parse_le_i32(data, offset)
-    noise_floor_level, offset = parse_le_u16(data, offset)
-    noise_floor_scale_factor, offset = parse_le_i16(data, offset)
-    power_offset_first_point, offset = parse_le_u16(data, offset)
-    loss_threshold, offset = parse_le_u16(data, offset)
-    reflectance_threshold, offset = parse_le_u16(data, offset)
-    end_of_fibre_threshold, offset = parse_le_u16(data, offset)
-    trace_type, offset = fixed_length_str(data, offset, 2)
-    window_coordinate_1, offset = parse_le_i32(data, offset)
-    window_coordinate_2, offset = parse_le_i32(data, offset)
-    window_coordinate_3, offset = parse_le_i32(data, offset)
-    window_coordinate_4, offset = parse_le_i32(data, offset)
+def fixed_parameters_block(data: bytes, offset: int, end: Optional[int] = None):
+    if end is None:
+        end = len(data)
+    offset = block_header(data, offset, "FxdParams", end)
+    if end - offset < _FP_PREFIX.size:
+        raise ParseError("Unexpected end of data in fixed parameters")
+    (date_time_stamp, units_of_distance, actual_wavelength, acquisition_offset, acquisition_offset_distance,
+     total_n_pulse_widths_used) = _FP_PREFIX.unpack_from(data, offset)
+    offset += _FP_PREFIX.size
+    units_of_distance = decode_fixed_length_str(units_of_distance)
+    pulse_widths_used, offset = parse_le_array(data, offset, 'h', 2, total_n_pulse_widths_used, end)
+    data_spacing, offset = parse_le_array(data, offset, 'i', 4, total_n_pulse_widths_used, end)
+    n_data_points_for_pulse_widths_used, offset = parse_le_array(data, offset, 'i', 4, total_n_pulse_widths_used, end)
+    if end - offset < _FP_SUFFIX.size:
+        raise ParseError("Unexpected end of data in fixed parameters")
+    (group_index, backscatter_coefficient, number_of_averages, averaging_time, acquisition_range,
+     acquisition_range_distance, front_panel_offset, noise_floor_level, noise_floor_scale_factor,
+     power_offset_first_point, loss_threshold, reflectance_threshold, end_of_fibre_threshold, trace_type,
+     window_coordinate_1, window_coordinate_2, window_coordinate_3,
+     window_coordinate_4) = _FP_SUFFIX.unpack_from(data, offset)
+    offset += _FP_SUFFIX.size
+    trace_type = decode_fixed_length_str(trace_type)
     fp = FixedParametersBlock(
-        date_time_stamp=date_time_stamp,
-        units_of_distance=units_of_distance,
-        actual_wavelength=actual_wavelength,
-        acquisition_offset=acquisition_offset,
-        acquisition_offset_distance=acquisition_offset_distance,
-        total_n_pulse_widths_used=total_n_pulse_widths_used,
-        pulse_widths_used=pulse_widths_used,
-        data_spacing=data_spacing,
-        n_data_points_for_pulse_widths_used=n_data_points_for_pulse_widths_used,
-        group_index=group_index,
-        backscatter_coefficient=backscatter_coefficient,
-        number_of_averages=number_of_averages,
-        averaging_time=averaging_time,
-        acquisition_range=acquisition_range,
-        acquisition_range_distance=acquisition_range_distance,
-        front_panel_offset=front_panel_offset,
-        noise_floor_level=noise_floor_level,
-        noise_floor_scale_factor=noise_floor_scale_factor,
-        power_offset_first_point=power_offset_first_point,
-        loss_threshold=loss_threshold,
-        reflectance_threshold=reflectance_threshold,
-        end_of_fibre_threshold=end_of_fibre_threshold,
-        trace_type=trace_type,
-        window_coordinate_1=window_coordinate_1,
-        window_coordinate_2=window_coordinate_2,
-        window_coordinate_3=window_coordinate_3,
-        window_coordinate_4=window_coordinate_4
+        date_time_stamp, units_of_distance, actual_wavelength, acquisition_offset,
+        acquisition_offset_distance, total_n_pulse_widths_used, pulse_widths_used, data_spacing,
+        n_data_points_for_pulse_widths_used, group_index, backscatter_coefficient, number_of_averages,
+        averaging_time, acquisition_range, acquisition_range_distance, front_panel_offset, noise_floor_level,
+        noise_floor_scale_factor, power_offset_first_point, loss_threshold, reflectance_threshold,
+        end_of_fibre_threshold, trace_type, window_coordinate_1, window_coordinate_2, window_coordinate_3,
+        window_coordinate_4
     )
     return fp, offset
 
 
-def key_event(data: bytes, offset: int):
-    event_number, offset = parse_le_i16(data, offset)
-    event_propogation_time, offset = parse_le_i32(data, offset)
-    attenuation_coefficient_lead_in_fiber, offset = parse_le_i16(data, offset)
-    event_loss, offset = parse_le_i16(data, offset)
-    event_reflectance, offset = parse_le_i32(data, offset)
-    event_code, offset = fixed_length_str(data, offset, 6)
-    loss_measurement_technique, offset = fixed_length_str(data, offset, 2)
-    marker_location_1, offset = parse_le_i32(data, offset)
-    marker_location_2, offset = parse_le_i32(data, offset)
-    marker_location_3, offset = parse_le_i32(data, offset)
-    marker_location_4, offset = parse_le_i32(data, offset)
-    marker_location_5, offset = parse_le_i32(data, offset)
-    comment, offset = null_terminated_str(data, offset)
-    ke = KeyEvent(
-        event_number=event_number,
-        event_propogation_time=event_propogation_time,
-        attenuation_coefficient_lead_in_fiber=attenuation_coefficient_lead_in_fiber,
-        event_loss=event_loss,
-        event_reflectance=event_reflectance,
-        event_code=event_code,
-        loss_measurement_technique=loss_measurement_technique,
-        marker_location_1=marker_location_1,
-        marker_location_2=marker_location_2,
-        marker_location_3=marker_location_3,
-        marker_location_4=marker_location_4,
-        marker_location_5=marker_location_5,
-        comment=comment
-    )
+def key_event(data: bytes, offset: int, end: Optional[int] = None):
+    if end is None:
+        end = len(data)
+    if end - offset < _KE_FIXED.size:
+        raise ParseError("Unexpected end of data in key event")
+    # Fields in KeyEvent order; event_code [5] and loss_measurement_technique [6] are still bytes
+    fields = _KE_FIXED.unpack_from(data, offset)
+    offset += _KE_FIXED.size
+    comment, offset = null_terminated_str(data, offset, end)
+    decode = decode_fixed_length_str
+    ke = KeyEvent(*fields[:5], decode(fields[5]), decode(fields[6]), *fields[7:], comment)
     return ke, offset
 
 
-def last_key_event(data: bytes, offset: int):
-    event_number, offset = parse_le_i16(data, offset)
-    event_propogation_time, offset = parse_le_i32(data, offset)
-    attenuation_coefficient_lead_in_fiber, offset = parse_le_i16(data, offset)
-    event_loss, offset = parse_le_i16(data, offset)
-    event_reflectance, offset = parse_le_i32(data, offset)
-    event_code, offset = fixed_length_str(data, offset, 6)
-    loss_measurement_technique, offset = fixed_length_str(data, offset, 2)
-    marker_location_1, offset = parse_le_i32(data, offset)
-    marker_location_2, offset = parse_le_i32(data, offset)
-    marker_location_3, offset = parse_le_i32(data, offset)
-    marker_location_4, offset = parse_le_i32(data, offset)
-    marker_location_5, offset = parse_le_i32(data, offset)
-    comment, offset = null_terminated_str(data, offset)
-    end_to_end_loss, offset = parse_le_i32(data, offset)
-    end_to_end_marker_position_1, offset = parse_le_i32(data, offset)
-    end_to_end_marker_position_2, offset = parse_le_i32(data, offset)
-    optical_return_loss, offset = parse_le_u16(data, offset)
-    optical_return_loss_marker_position_1, offset = parse_le_i32(data, offset)
-    optical_return_loss_marker_position_2, offset = parse_le_i32(data, offset)
-    lke = LastKeyEvent(
-        event_number=event_number,
-        event_propogation_time=event_propogation_time,
-        attenuation_coefficient_lead_in_fiber=attenuation_coefficient_lead_in_fiber,
-        event_loss=event_loss,
-        event_reflectance=event_reflectance,
-        event_code=event_code,
-        loss_measurement_technique=loss_measurement_technique,
-        marker_location_1=marker_location_1,
-        marker_location_2=marker_location_2,
-        marker_location_3=marker_location_3,
-        marker_location_4=marker_location_4,
-        marker_location_5=marker_location_5,
-        comment=comment,
-        end_to_end_loss=end_to_end_loss,
-        end_to_end_marker_position_1=end_to_end_marker_position_1,
-        end_to_end_marker_position_2=end_to_end_marker_position_2,
-        optical_return_loss=optical_return_loss,
-        optical_return_loss_marker_position_1=optical_return_loss_marker_position_1,
-        optical_return_loss_marker_position_2=optical_return_loss_marker_position_2
-    )
+def last_key_event(data: bytes, offset: int, end: Optional[int] = None):
+    if end is None:
+        end = len(data)
+    if end - offset < _KE_FIXED.size:
+        raise ParseError("Unexpected end of data in key event")
+    # Same leading fields as key_event, then the end-to-end and optical return loss fields
+    fields = _KE_FIXED.unpack_from(data, offset)
+    offset += _KE_FIXED.size
+    comment, offset = null_terminated_str(data, offset, end)
+    if end - offset < _LKE_SUFFIX.size:
+        raise ParseError("Unexpected end of data in last key event")
+    suffix = _LKE_SUFFIX.unpack_from(data, offset)
+    offset += _LKE_SUFFIX.size
+    decode = decode_fixed_length_str
+    lke = LastKeyEvent(*fields[:5], decode(fields[5]), decode(fields[6]), *fields[7:], comment, *suffix)
     return lke, offset
 
 
-def key_events_block(data: bytes, offset: int):
-    offset = block_header(data, offset, "KeyEvents")
-    number_of_key_events, offset = parse_le_i16(data, offset)
+def key_events_without_comments(data: bytes, offset: int, n_key_events: int, end: Optional[int] = None):
+    if end is None:
+        end = len(data)
+    # Fast path: when none of the key events has a comment they are fixed-size records
+    # and can be read in one call. Returns None if that is not the case.
+    size = _KE_EMPTY_COMMENT_DTYPE.itemsize * n_key_events
+    if n_key_events == 0 or end - offset < size:
+        return None
+    records = np.frombuffer(data, dtype=_KE_EMPTY_COMMENT_DTYPE, count=n_key_events, offset=offset)
+    # The first event with a comment has a non-null byte where the terminator would be
+    if records['comment_terminator'].any():
+        return None
+    decode = decode_fixed_length_str
+    key_events_list = [
+        KeyEvent(number, time, atten, loss, refl, decode(code), decode(technique), m1, m2, m3, m4, m5, "")
+        for number, time, atten, loss, refl, code, technique, m1, m2, m3, m4, m5, _ in records.tolist()
+    ]
+    return key_events_list, offset + size
+
+
+def key_events_block(data: bytes, offset: int, end: Optional[int] = None):
+    offset = block_header(data, offset, "KeyEvents", end)
+    number_of_key_events, offset = parse_le_i16(data, offset, end)
     n_key_events = number_of_key_events - 1
     if n_key_events < 0:
         raise ParseError("Invalid number of key events")
-    key_events_list = []
-    for _ in range(n_key_events):
-        ke, offset = key_event(data, offset)
-        key_events_list.append(ke)
-    lke, offset = last_key_event(data, offset)
-    ke_block = KeyEvents(
-        number_of_key_events=number_of_key_events,
-        key_events=key_events_list,
-        last_key_event=lke
-    )
+    fast = key_events_without_comments(data, offset, n_key_events, end)
+    if fast is not None:
+        key_events_list, offset = fast
+    else:
+        key_events_list = [None] * n_key_events
+        parse_key_event = key_event  # local lookup inside the loop
+        for i in range(n_key_events):
+            key_events_list[i], offset = parse_key_event(data, offset, end)
+    lke, offset = last_key_event(data, offset, end)
+    ke_block = KeyEvents(number_of_key_events, key_events_list, lke)
     return ke_block, offset
 
 
-def landmark(data: bytes, offset: int):
+def landmark(data: bytes, offset: int, end: Optional[int] = None):
     # Note: The Rust version calls block_header with "LnkParams" here.
     # This implementation does so as well.
-    offset = block_header(data, offset, "LnkParams")
-    landmark_number, offset = parse_le_i16(data, offset)
-    landmark_code, offset = fixed_length_str(data, offset, 2)
-    landmark_location, offset = parse_le_i32(data, offset)
-    related_event_number, offset = parse_le_i16(data, offset)
-    gps_longitude, offset = parse_le_i32(data, offset)
-    gps_latitude, offset = parse_le_i32(data, offset)
-    fiber_correction_factor_lead_in_fiber, offset = parse_le_i16(data, offset)
-    sheath_marker_entering_landmark, offset = parse_le_i32(data, offset)
-    sheath_marker_leaving_landmark, offset = parse_le_i32(data, offset)
-    units_of_sheath_marks_leaving_landmark, offset = fixed_length_str(data, offset, 2)
-    mode_field_diameter_leaving_landmark, offset = parse_le_i16(data, offset)
-    comment, offset = null_terminated_str(data, offset)
-    lm = Landmark(
-        landmark_number=landmark_number,
-        landmark_code=landmark_code,
-        landmark_location=landmark_location,
-        related_event_number=related_event_number,
-        gps_longitude=gps_longitude,
-        gps_latitude=gps_latitude,
-        fiber_correction_factor_lead_in_fiber=fiber_correction_factor_lead_in_fiber,
-        sheath_marker_entering_landmark=sheath_marker_entering_landmark,
-        sheath_marker_leaving_landmark=sheath_marker_leaving_landmark,
-        units_of_sheath_marks_leaving_landmark=units_of_sheath_marks_leaving_landmark,
-        mode_field_diameter_leaving_landmark=mode_field_diameter_leaving_landmark,
-        comment=comment
-    )
+    if end is None:
+        end = len(data)
+    offset = block_header(data, offset, "LnkParams", end)
+    if end - offset < _LM_FIXED.size:
+        raise ParseError("Unexpected end of data in landmark")
+    # Fields in Landmark order; landmark_code [1] and units_of_sheath_marks_leaving_landmark [9] are still bytes
+    fields = _LM_FIXED.unpack_from(data, offset)
+    offset += _LM_FIXED.size
+    comment, offset = null_terminated_str(data, offset, end)
+    decode = decode_fixed_length_str
+    lm = Landmark(fields[0], decode(fields[1]), *fields[2:9], decode(fields[9]), fields[10], comment)
     return lm, offset
 
 
-def link_parameters_block(data: bytes, offset: int):
-    offset = block_header(data, offset, "LnkParams")
-    number_of_landmarks, offset = parse_le_i16(data, offset)
-    landmarks_list = []
-    for _ in range(number_of_landmarks):
-        lm, offset = landmark(data, offset)
-        landmarks_list.append(lm)
-    lp = LinkParameters(
-        number_of_landmarks=number_of_landmarks,
-        landmarks=landmarks_list
-    )
+def link_parameters_block(data: bytes, offset: int, end: Optional[int] = None):
+    offset = block_header(data, offset, "LnkParams", end)
+    number_of_landmarks, offset = parse_le_i16(data, offset, end)
+    landmarks_list = [None] * max(number_of_landmarks, 0)
+    parse_landmark = landmark  # local lookup inside the loop
+    for i in range(number_of_landmarks):
+        landmarks_list[i], offset = parse_landmark(data, offset, end)
+    lp = LinkParameters(number_of_landmarks, landmarks_list)
     return lp, offset
 
 
-def data_points_at_scale_factor(data: bytes, offset: int):
-    n_points, offset = parse_le_i32(data, offset)
-    scale_factor, offset = parse_le_i16(data, offset)
-    data_points_list = []
-    for _ in range(n_points):
-        dp, offset = parse_le_u16(data, offset)
-        data_points_list.append(dp)
-    dpsf = DataPointsAtScaleFactor(
-        n_points=n_points,
-        scale_factor=scale_factor,
-        data=data_points_list
-    )
+def data_points_at_scale_factor(data: bytes, offset: int, end: Optional[int] = None):
+    if end is None:
+        end = len(data)
+    if end - offset < _DP_COUNTS.size:
+        raise ParseError("Unexpected end of data in data points")
+    n_points, scale_factor = _DP_COUNTS.unpack_from(data, offset)
+    offset += _DP_COUNTS.size
+    # Decode all samples at once as a read-only view onto the buffer
+    count = max(n_points, 0)
+    if end - offset < 2 * count:
+        raise ParseError("Unexpected end of data in data points")
+    data_points = np.frombuffer(data, dtype='<u2', count=count, offset=offset)
+    offset += 2 * count
+    dpsf = DataPointsAtScaleFactor(n_points, scale_factor, data_points)
     return dpsf, offset
 
 
-def data_points_block(data: bytes, offset: int):
-    offset = block_header(data, offset, "DataPts")
-    number_of_data_points, offset = parse_le_i32(data, offset)
-    total_number_scale_factors_used, offset = parse_le_i16(data, offset)
-    scale_factors = []
-    for _ in range(total_number_scale_factors_used):
-        sf, offset = data_points_at_scale_factor(data, offset)
-        scale_factors.append(sf)
-    dp = DataPoints(
-        number_of_data_points=number_of_data_points,
-        total_number_scale_factors_used=total_number_scale_factors_used,
-        scale_factors=scale_factors
-    )
+def data_points_block(data: bytes, offset: int, end: Optional[int] = None):
+    if end is None:
+        end = len(data)
+    offset = block_header(data, offset, "DataPts", end)
+    if end - offset < _DP_COUNTS.size:
+        raise ParseError("Unexpected end of data in data points")
+    number_of_data_points, total_number_scale_factors_used = _DP_COUNTS.unpack_from(data, offset)
+    offset += _DP_COUNTS.size
+    scale_factors = [None] * max(total_number_scale_factors_used, 0)
+    parse_scale_factor = data_points_at_scale_factor  # local lookup inside the loop
+    for i in range(total_number_scale_factors_used):
+        scale_factors[i], offset = parse_scale_factor(data, offset, end)
+    dp = DataPoints(number_of_data_points, total_number_scale_factors_used, scale_factors)
     return dp, offset
 
 
-def proprietary_block(data: bytes, offset: int):
+def proprietary_block(data: bytes, offset: int, end: Optional[int] = None):
+    if end is None:
+        end = len(data)
     # Reads a null-terminated header string; any remaining data is stored as-is.
-    header, offset = null_terminated_str(data, offset)
-    pb = ProprietaryBlock(header=header, data=data[offset:])
+    header, offset = null_terminated_str(data, offset, end)
+    pb = ProprietaryBlock(header, bytes(data[offset:end]))
     # For our purposes we return all remaining data as the proprietary payload.
-    return pb, len(data)
+    return pb, end
 
 # --------------------------
 # High-level File Parser
 # --------------------------
 
 
-def extract_block_data(data: bytes, header: str, map_blk: MapBlock) -> bytes:
-    # Calculate the offset of a given block by walking the MapBlock’s info.
+def block_locations(map_blk: MapBlock) -> Dict[str, Tuple[int, int]]:
+    # Start offset and size of each block, which follow the map block in map order.
+    # The first block with a given identifier wins.
+    locations = {}
     offset = map_blk.block_size
-    length = 0
     for bi in map_blk.block_info:
-        length = bi.size
-        if bi.identifier == header:
+        locations.setdefault(bi.identifier, (offset, bi.size))
+        if bi.size < 0:  # later offsets would be incorrect (the Rust code checks for overflow)
             break
-        new_offset = offset + bi.size
-        if new_offset < offset:  # check for overflow (the Rust code does this)
-            raise ParseError("Error with block data – offset value is incorrect")
-        offset = new_offset
-    final_byte = offset + length
-    if offset > len(data) or final_byte > len(data):
-        raise ParseError("Error with block data – reported block position or length is incorrect")
-    return data[offset:final_byte]
+        offset += bi.size
+    return locations
+
+
+# Parser for each block type that is parsed
+_BLOCK_PARSERS = {
+    BLOCK_ID_SUPPARAMS: supplier_parameters_block,
+    BLOCK_ID_GENPARAMS: general_parameters_block,
+    BLOCK_ID_FXDPARAMS: fixed_parameters_block,
+    BLOCK_ID_KEYEVENTS: key_events_block,
+    BLOCK_ID_DATAPTS: data_points_block,
+}
+# Known blocks that are not parsed: link parameters are unimplemented due to lack of test data
+# (one could add link_parameters_block above), and no checksum verification is performed
+_SKIPPED_BLOCKS = frozenset((BLOCK_ID_LNKPARAMS, BLOCK_ID_CHECKSUM))
 
 
 def parse_file(data: bytes) -> SORFile:
-    # Parse the MapBlock first (which describes the locations/sizes of all blocks)
+    # A memoryview lets bytes, bytearray and mmap input share the same parsers
+    data = memoryview(data)
+    # Parse the MapBlock (which describes the locations/sizes of all blocks); the blocks
+    # themselves are parsed in place on first access, so callers that only need
+    # metadata never decode the data points
     map_blk, _ = map_block(data, 0)
-    general_parameters: Optional[GeneralParametersBlock] = None
-    supplier_parameters: Optional[SupplierParametersBlock] = None
-    fixed_parameters: Optional[FixedParametersBlock] = None
-    key_events: Optional[KeyEvents] = None
-    link_parameters: Optional[LinkParameters] = None
-    data_points: Optional[DataPoints] = None
-    proprietary_blocks: List[ProprietaryBlock] = []
-
-    # Iterate over each block in the MapBlock
-    for bi in map_blk.block_info:
-        try:
-            block_data = extract_block_data(data, bi.identifier, map_blk)
-        except ParseError:
-            block_data = b""
-        local_offset = 0
-        if bi.identifier == "SupParams":
-            sp, _ = supplier_parameters_block(block_data, local_offset)
-            supplier_parameters = sp
-        elif bi.identifier == "GenParams":
-            gp, _ = general_parameters_block(block_data, local_offset)
-            general_parameters = gp
-        elif bi.identifier == "FxdParams":
-            fp, _ = fixed_parameters_block(block_data, local_offset)
-            fixed_parameters = fp
-        elif bi.identifier == "KeyEvents":
-            ke, _ = key_events_block(block_data, local_offset)
-            key_events = ke
-        elif bi.identifier == "LnkParams":
-            # Unimplemented due to lack of test data; one could call link_parameters_block here.
-            pass
-        elif bi.identifier == "DataPts":
-            dp, _ = data_points_block(block_data, local_offset)
-            data_points = dp
-        elif bi.identifier == "Cksum":
-            # Checksum block – no parsing performed here.
-            pass
-        else:
-            pb, _ = proprietary_block(block_data, local_offset)
-            proprietary_blocks.append(pb)
-
-    sor = SORFile(
-        map=map_blk,
-        general_parameters=general_parameters,
-        supplier_parameters=supplier_parameters,
-        fixed_parameters=fixed_parameters,
-        key_events=key_events,
-        link_parameters=link_parameters,
-        data_points=data_points,
-        proprietary_blocks=proprietary_blocks
-    )
-    return sor
+    return SORFile(data, map_blk)
+
+
+def parse_path(path: str) -> SORFile:
+    # Memory-map the file read-only instead of reading it into a bytes object;
+    # the parsed data point arrays are views that keep the mapping alive
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ParseError("Empty SOR file")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return parse_file(memoryview(mm))
 
 
 def encode_null_terminated_str(b: bytearray, s: str):